@@ -5,10 +5,15 @@ from utils.rag_engine import MentalHealthRAG
 from utils.safety_monitor import SafetyMonitor
 from utils.mcp_handler import MCPHandler
 from utils.web_search_tavily import TavilyWebSearch
+from utils.chat_history import ChatHistory
 
 # Load environment variables
 load_dotenv()
 
+# Chat history rendering limits
+HISTORY_PAGE_SIZE = 20
+HISTORY_MAX_IN_MEMORY = 50
+
 # Initialize components
 @st.cache_resource
 def initialize_components():
@@ -23,6 +28,20 @@ def initialize_components():
     )
     return rag_engine, safety_monitor, mcp_handler, web_search
 
+def display_chat_history():
+    """Render only the most recent page(s) of the conversation"""
+    history = st.session_state.chat_history
+    visible = min(st.session_state.history_visible, len(history))
+    
+    if visible < len(history):
+        if st.button(f"⬆️ Load earlier messages ({len(history) - visible} hidden)"):
+            st.session_state.history_visible += HISTORY_PAGE_SIZE
+            st.rerun()
+    
+    for message in history.get_window(visible):
+        with st.chat_message(message["role"]):
+            st.markdown(message["content"])
+
 def main():
     st.set_page_config(
         page_title="Mindful Companion",
@@ -61,24 +80,25 @@ def main():
     st.markdown("### Your compassionate AI mental health support partner")
     
     # Initialize session state
-    if "messages" not in st.session_state:
-        st.session_state.messages = []
+    if "chat_history" not in st.session_state:
+        st.session_state.chat_history = ChatHistory(max_in_memory=HISTORY_MAX_IN_MEMORY)
+        st.session_state.history_visible = HISTORY_PAGE_SIZE
         # Add welcome message
-        st.session_state.messages.append({
+        st.session_state.chat_history.append({
             "role": "assistant", 
             "content": "Hi there! I'm here to listen and offer support. How are you feeling today? 💭"
         })
     
-      
     # Display chat messages
-    for message in st.session_state.messages:
-        with st.chat_message(message["role"]):
-            st.markdown(message["content"])
+    display_chat_history()
     
     # Chat input
     if prompt := st.chat_input("Share what's on your mind..."):
+        # Snap back to the latest page so paging back doesn't stay expensive
+        st.session_state.history_visible = HISTORY_PAGE_SIZE
+        
         # Add user message
-        st.session_state.messages.append({"role": "user", "content": prompt})
+        st.session_state.chat_history.append({"role": "user", "content": prompt})
         with st.chat_message("user"):
             st.markdown(prompt)
         
@@ -90,7 +110,7 @@ def main():
             crisis_response = safety_monitor.get_crisis_response(risk_level)
             with st.chat_message("assistant"):
                 st.markdown(crisis_response)
-            st.session_state.messages.append({
+            st.session_state.chat_history.append({
                 "role": "assistant", 
                 "content": crisis_response
             })
@@ -109,7 +129,7 @@ def main():
             with st.chat_message("assistant"):
                 st.markdown(ai_response)
             
-            st.session_state.messages.append({
+            st.session_state.chat_history.append({
                 "role": "assistant", 
                 "content": ai_response
             })
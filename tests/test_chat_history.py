@@ -0,0 +1,54 @@
+from utils.chat_history import ChatHistory
+
+
+def make_history(total, max_in_memory=5, chunk_size=3):
+    history = ChatHistory(max_in_memory=max_in_memory, chunk_size=chunk_size)
+    for i in range(total):
+        history.append({"role": "user", "content": str(i)})
+    return history
+
+
+def contents(messages):
+    return [int(m["content"]) for m in messages]
+
+
+def test_append_spills_oldest_chunks():
+    history = make_history(8)
+    assert len(history.recent) == 8
+    assert history.spilled_chunks == []
+
+    history.append({"role": "user", "content": "8"})
+    assert len(history.spilled_chunks) == 1
+    assert history.spilled_count == 3
+    assert contents(history.recent) == list(range(3, 9))
+    assert len(history) == 9
+
+
+def test_window_within_recent():
+    history = make_history(30)
+    recent = len(history.recent)
+    assert history.get_window(0) == []
+    assert contents(history.get_window(1)) == [29]
+    assert contents(history.get_window(recent)) == list(range(30 - recent, 30))
+
+
+def test_window_crossing_spilled_chunk_edges():
+    history = make_history(30)
+    recent = len(history.recent)
+    for count in (recent + 1, recent + 3, recent + 4, 29, 30):
+        assert contents(history.get_window(count)) == list(range(30 - count, 30))
+
+
+def test_window_larger_than_history():
+    history = make_history(30)
+    assert contents(history.get_window(100)) == list(range(30))
+
+
+def test_oldest_chunks_dropped_past_limit():
+    history = ChatHistory(max_in_memory=5, chunk_size=3, max_spilled_chunks=2)
+    for i in range(30):
+        history.append({"role": "user", "content": str(i)})
+    assert len(history.spilled_chunks) == 2
+    assert history.dropped_count == 18
+    assert len(history) == 12
+    assert contents(history.get_window(100)) == list(range(18, 30))
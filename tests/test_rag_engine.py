@@ -0,0 +1,229 @@
+import sys
+import threading
+import time
+import types
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+
+# The engine is exercised against in-memory collections, so the vector DB and
+# data loader libraries only need to be importable
+for name in ("chromadb", "chromadb.utils", "datasets", "requests", "bs4"):
+    sys.modules.setdefault(name, types.ModuleType(name))
+sys.modules["chromadb.utils"].__dict__.setdefault("embedding_functions", None)
+sys.modules["datasets"].__dict__.setdefault("load_dataset", None)
+sys.modules["bs4"].__dict__.setdefault("BeautifulSoup", None)
+
+from utils import rag_engine
+from utils.rag_engine import DEFAULT_SHARD, MAX_QUEUED_PER_SHARD, SHARD_CONFIG, MentalHealthRAG
+
+
+class FakeCollection:
+    """In-memory stand-in for a Chroma collection; distances come from metadata"""
+
+    def __init__(self, gate=None):
+        self.records = []
+        self.gate = gate
+        self.count_calls = 0
+
+    def count(self):
+        self.count_calls += 1
+        return len(self.records)
+
+    def add(self, documents, metadatas, ids, embeddings=None):
+        embeddings = embeddings or [None] * len(documents)
+        self.records.extend(zip(ids, documents, metadatas, embeddings))
+
+    def get(self, include):
+        return {
+            "ids": [r[0] for r in self.records],
+            "documents": [r[1] for r in self.records],
+            "metadatas": [r[2] for r in self.records],
+            "embeddings": [r[3] for r in self.records]
+        }
+
+    def query(self, query_embeddings, n_results):
+        if self.gate is not None:
+            self.gate.wait()
+        hits = sorted(self.records, key=lambda r: r[2]["distance"])[:n_results]
+        return {
+            "documents": [[r[1] for r in hits]],
+            "metadatas": [[r[2] for r in hits]],
+            "distances": [[r[2]["distance"] for r in hits]]
+        }
+
+
+class FakeClient:
+    def __init__(self, collections):
+        self.collections = collections
+
+    def get_collection(self, name):
+        if name not in self.collections:
+            raise ValueError(f"Collection {name} does not exist")
+        return self.collections[name]
+
+    def delete_collection(self, name):
+        del self.collections[name]
+
+
+def make_rag(collections=None, client=None):
+    rag = MentalHealthRAG.__new__(MentalHealthRAG)
+    rag.client = client
+    rag.collections = {shard: FakeCollection() for shard in SHARD_CONFIG}
+    rag.collections.update(collections or {})
+    rag.executors = {
+        shard: ThreadPoolExecutor(max_workers=config["max_in_flight"])
+        for shard, config in SHARD_CONFIG.items()
+    }
+    rag.shard_slots = {
+        shard: threading.BoundedSemaphore(config["max_in_flight"] + MAX_QUEUED_PER_SHARD)
+        for shard, config in SHARD_CONFIG.items()
+    }
+    rag.embed_calls = 0
+
+    def embed(texts):
+        rag.embed_calls += 1
+        return [[0.0] for _ in texts]
+
+    rag.embedding_function = embed
+    return rag
+
+
+def add_doc(rag, shard, content, distance):
+    rag.collections[shard].add([content], [{"type": shard, "distance": distance}], [content])
+
+
+def free_slots(rag, shard):
+    """Count how many slots can be taken right now, then give them back"""
+    taken = 0
+    while rag.shard_slots[shard].acquire(blocking=False):
+        taken += 1
+    for _ in range(taken):
+        rag.shard_slots[shard].release()
+    return taken
+
+
+@pytest.fixture
+def fast_timeouts(monkeypatch):
+    for shard in SHARD_CONFIG:
+        monkeypatch.setitem(SHARD_CONFIG[shard], "timeout", 0.2)
+
+
+def test_select_shards_matches_keywords_on_word_boundaries():
+    rag = make_rag()
+    for shard in SHARD_CONFIG:
+        add_doc(rag, shard, f"{shard} doc", 0.5)
+
+    assert "medical_qa" in dict(rag.select_shards("Any clinical studies on anxiety?"))
+    assert "medical_qa" not in dict(rag.select_shards("I feel impatient"))
+    assert "medical_qa" not in dict(rag.select_shards("Stressed about studying for exams"))
+    assert dict(rag.select_shards("I feel sad"))["web_scraped"] == 1
+
+
+def test_select_shards_skips_empty_shards():
+    rag = make_rag()
+    add_doc(rag, "coping_strategy", "breathe", 0.5)
+    assert rag.select_shards("I feel sad") == [("coping_strategy", 1)]
+
+
+def test_add_documents_routes_by_type_with_default_fallback():
+    rag = make_rag()
+    rag.add_documents(
+        [
+            ({"content": "qa", "metadata": {"type": "medical_qa"}}, "a"),
+            ({"content": "misc", "metadata": {"type": "unknown"}}, "b"),
+            ({"content": "untyped", "metadata": {}}, "c")
+        ],
+        embeddings=[[1.0], [2.0], [3.0]]
+    )
+
+    assert rag.collections["medical_qa"].get(include=[])["embeddings"] == [[1.0]]
+    default = rag.collections[DEFAULT_SHARD].get(include=[])
+    assert default["ids"] == ["b", "c"]
+    assert default["embeddings"] == [[2.0], [3.0]]
+
+
+def test_retrieve_merges_shards_by_distance():
+    rag = make_rag()
+    add_doc(rag, "web_scraped", "web far", 0.9)
+    add_doc(rag, "web_scraped", "web near", 0.1)
+    add_doc(rag, "coping_strategy", "coping", 0.3)
+    add_doc(rag, "support_advice", "support", 0.5)
+
+    results = rag.retrieve_relevant_content("I feel sad", n_results=3)
+
+    assert [r["content"] for r in results] == ["web near", "coping", "support"]
+    assert rag.embed_calls == 1
+    # select_shards counted each shard once; query_shard reused the counts
+    assert rag.collections["web_scraped"].count_calls == 1
+
+
+def test_slow_shard_times_out_and_frees_its_slot(fast_timeouts):
+    gate = threading.Event()
+    rag = make_rag({"web_scraped": FakeCollection(gate=gate)})
+    add_doc(rag, "web_scraped", "slow", 0.1)
+    add_doc(rag, "coping_strategy", "coping", 0.3)
+
+    results = rag.retrieve_relevant_content("I feel sad")
+
+    assert [r["content"] for r in results] == ["coping"]
+    gate.set()
+    rag.executors["web_scraped"].shutdown(wait=True)
+    assert free_slots(rag, "web_scraped") == SHARD_CONFIG["web_scraped"]["max_in_flight"] + MAX_QUEUED_PER_SHARD
+
+
+def test_busy_shard_is_skipped():
+    rag = make_rag()
+    add_doc(rag, "web_scraped", "web", 0.1)
+    add_doc(rag, "coping_strategy", "coping", 0.3)
+    while rag.shard_slots["web_scraped"].acquire(blocking=False):
+        pass
+
+    results = rag.retrieve_relevant_content("I feel sad")
+
+    assert [r["content"] for r in results] == ["coping"]
+
+
+def test_queued_queries_are_cancelled_within_one_timeout(fast_timeouts, monkeypatch):
+    gates = {shard: threading.Event() for shard in ("web_scraped", "coping_strategy")}
+    rag = make_rag({shard: FakeCollection() for shard in gates})
+    for shard, gate in gates.items():
+        monkeypatch.setitem(SHARD_CONFIG[shard], "max_in_flight", 1)
+        rag.executors[shard] = ThreadPoolExecutor(max_workers=1)
+        # Occupy the only worker so the next query stays queued
+        rag.executors[shard].submit(gate.wait)
+        add_doc(rag, shard, f"{shard} doc", 0.1)
+    slots_before = {shard: free_slots(rag, shard) for shard in gates}
+
+    start = time.monotonic()
+    results = rag.retrieve_relevant_content("I feel sad")
+    elapsed = time.monotonic() - start
+
+    assert results == []
+    # Queue waits run concurrently rather than adding up per shard
+    assert elapsed < 0.35
+    for shard, gate in gates.items():
+        gate.set()
+        assert free_slots(rag, shard) == slots_before[shard]
+
+
+def test_migrate_legacy_collection_moves_documents_and_deletes_it():
+    legacy = FakeCollection()
+    legacy.add(
+        ["web page", "pubmed answer"],
+        [{"type": "web_scraped"}, {"type": "medical_qa"}],
+        ["web_0", "hf_1"],
+        embeddings=[[0.1], [0.2]]
+    )
+    client = FakeClient({rag_engine.LEGACY_COLLECTION: legacy})
+    rag = make_rag(client=client)
+
+    assert rag.migrate_legacy_collection() is True
+    assert rag_engine.LEGACY_COLLECTION not in client.collections
+    assert rag.collections["medical_qa"].get(include=[])["embeddings"] == [[0.2]]
+    assert rag.collections["web_scraped"].get(include=[])["ids"] == ["web_0"]
+
+
+def test_migrate_legacy_collection_without_legacy_data():
+    rag = make_rag(client=FakeClient({}))
+    assert rag.migrate_legacy_collection() is False
@@ -0,0 +1,65 @@
+"""Bounded chat history with compressed spill-over for older messages"""
+import json
+import zlib
+from typing import Dict, List
+
+
+class ChatHistory:
+    """Keeps the most recent messages in memory and compresses older ones
+
+    Only `max_in_memory` messages are held as plain dicts. Anything older is
+    packed into zlib-compressed chunks of `chunk_size` messages. At most
+    `max_spilled_chunks` chunks are kept; beyond that the oldest chunk is
+    dropped, so per-session memory has a fixed ceiling at the cost of the
+    earliest messages no longer being viewable.
+    """
+
+    def __init__(self, max_in_memory: int = 50, chunk_size: int = 25, max_spilled_chunks: int = 8):
+        self.max_in_memory = max_in_memory
+        self.chunk_size = chunk_size
+        self.max_spilled_chunks = max_spilled_chunks
+        self.recent: List[Dict] = []
+        self.spilled_chunks: List[bytes] = []
+        self.spilled_count = 0
+        self.dropped_count = 0
+
+    def __len__(self) -> int:
+        """Number of messages still retained"""
+        return self.spilled_count + len(self.recent)
+
+    def append(self, message: Dict):
+        """Add a message and spill the oldest ones once the window is full"""
+        self.recent.append(message)
+        if len(self.recent) > self.max_in_memory + self.chunk_size:
+            chunk = self.recent[:self.chunk_size]
+            self.recent = self.recent[self.chunk_size:]
+            self.spilled_chunks.append(
+                zlib.compress(json.dumps(chunk).encode("utf-8"))
+            )
+            self.spilled_count += len(chunk)
+            if len(self.spilled_chunks) > self.max_spilled_chunks:
+                self.spilled_chunks.pop(0)
+                self.spilled_count -= self.chunk_size
+                self.dropped_count += self.chunk_size
+
+    def get_window(self, count: int) -> List[Dict]:
+        """
+        Return the last `count` messages in chronological order
+
+        Args:
+            count: Number of most recent messages to return
+
+        Returns:
+            List of message dictionaries, oldest first
+        """
+        if count <= len(self.recent):
+            return self.recent[len(self.recent) - count:] if count > 0 else []
+
+        # Decompress only as many spilled chunks as the window needs
+        needed = count - len(self.recent)
+        earlier: List[Dict] = []
+        for chunk in reversed(self.spilled_chunks):
+            earlier = json.loads(zlib.decompress(chunk).decode("utf-8")) + earlier
+            if len(earlier) >= needed:
+                break
+        return earlier[max(len(earlier) - needed, 0):] + self.recent
@@ -1,91 +1,272 @@
 import chromadb
-from typing import List, Dict
+import re
+import threading
+import time
+from chromadb.utils import embedding_functions
+from concurrent.futures import ThreadPoolExecutor, TimeoutError as FutureTimeoutError
+from typing import List, Dict, Optional, Tuple
 from utils.huggingface_loader import HuggingFaceLoader
 from utils.web_loader import WebDataLoader
 #from utils.pdf_loader import PDFLoader
 #from utils.api_loader import APIDataLoader
 
+# Knowledge is partitioned into one collection per document type. Shards with
+# keywords are only searched when the query mentions one of them as a whole
+# word; shards without keywords are always searched. `max_in_flight` caps how
+# many queries a shard may run at once across all sessions.
+SHARD_CONFIG = {
+    "web_scraped": {
+        "collection": "mental_health_web",
+        "keywords": [],
+        "timeout": 1.0,
+        "max_in_flight": 4
+    },
+    "medical_qa": {
+        "collection": "mental_health_clinical",
+        "keywords": [
+            "studies", "research", "clinical", "trial", "trials", "pubmed",
+            "medication", "medications", "diagnosis", "diagnosed", "disorder",
+            "efficacy", "prevalence"
+        ],
+        "timeout": 2.0,
+        "max_in_flight": 1
+    },
+    "coping_strategy": {
+        "collection": "mental_health_coping",
+        "keywords": [],
+        "timeout": 0.5,
+        "max_in_flight": 4
+    },
+    "support_advice": {
+        "collection": "mental_health_support",
+        "keywords": [],
+        "timeout": 0.5,
+        "max_in_flight": 4
+    }
+}
+DEFAULT_SHARD = "web_scraped"
+
+# Queries allowed to wait for a free worker before a shard is skipped as busy
+MAX_QUEUED_PER_SHARD = 4
+
+# Single collection used before the knowledge base was sharded
+LEGACY_COLLECTION = "mental_health_knowledge"
+
+SHARD_PATTERNS = {
+    shard: re.compile(r"\b(?:" + "|".join(map(re.escape, config["keywords"])) + r")\b")
+    for shard, config in SHARD_CONFIG.items()
+    if config["keywords"]
+}
+
+
 class MentalHealthRAG:
     def __init__(self):
         self.client = chromadb.PersistentClient(path="./mental_health_db")
-        self.collection = self.client.get_or_create_collection("mental_health_knowledge")
-        
+        self.embedding_function = embedding_functions.DefaultEmbeddingFunction()
+        self.collections = {
+            shard: self.client.get_or_create_collection(
+                config["collection"], embedding_function=self.embedding_function
+            )
+            for shard, config in SHARD_CONFIG.items()
+        }
+        # One pool and slot counter per shard, so a stalled shard can only
+        # tie up its own workers and never delays queries to other shards
+        self.executors = {
+            shard: ThreadPoolExecutor(max_workers=config["max_in_flight"])
+            for shard, config in SHARD_CONFIG.items()
+        }
+        self.shard_slots = {
+            shard: threading.BoundedSemaphore(config["max_in_flight"] + MAX_QUEUED_PER_SHARD)
+            for shard, config in SHARD_CONFIG.items()
+        }
+    
+        # Load the embedding model now rather than on the first user query
+        self.embedding_function(["warm up"])
+    
         # Initialize data loaders
         self.web_loader = WebDataLoader()
         self.hf_loader = HuggingFaceLoader()
         self.load_dynamic_knowledge()
     
+    def total_count(self) -> int:
+        return sum(collection.count() for collection in self.collections.values())
+    
     def load_dynamic_knowledge(self):
         """Load data from multiple dynamic sources"""
-        if self.collection.count() == 0:
+        if self.total_count() == 0 and not self.migrate_legacy_collection():
             print(" Loading dynamic mental health knowledge...")
-            
-            all_documents = []
-            all_metadatas = []
-            all_ids = []
-            doc_id = 0
-            
+    
+            documents = []
+    
             # 1. Web Scraping
             web_docs = self.web_loader.scrape_mental_health_resources()
-            for doc in web_docs:
-                all_documents.append(doc["content"])
-                all_metadatas.append(doc["metadata"])
-                all_ids.append(f"web_{doc_id}")
-                doc_id += 1
-            
+            for doc_id, doc in enumerate(web_docs):
+                documents.append((doc, f"web_{doc_id}"))
+    
             # 2. Hugging Face Datasets
             hf_docs = self.hf_loader.load_mental_health_datasets()
-            for doc in hf_docs:
-                all_documents.append(doc["content"])
-                all_metadatas.append(doc["metadata"])
-                all_ids.append(f"hf_{doc_id}")
-                doc_id += 1
-            
-            # Load into vector DB
-            if all_documents:
-                self.collection.add(
-                    documents=all_documents,
-                    metadatas=all_metadatas,
-                    ids=all_ids
-                )
-                print(f"Loaded {len(all_documents)} documents from dynamic sources")
-            else:
+            for doc_id, doc in enumerate(hf_docs, start=len(documents)):
+                documents.append((doc, f"hf_{doc_id}"))
+    
+            if not documents:
                 print(" No documents loaded - using fallback")
-                self.load_fallback_data()
+                fallback_docs = self.hf_loader.load_fallback_data()
+                documents = [(doc, f"fallback_{doc_id}") for doc_id, doc in enumerate(fallback_docs)]
+    
+            self.add_documents(documents)
+    
+    def migrate_legacy_collection(self) -> bool:
+        """
+        Move documents from the pre-sharding collection into the shards
+    
+        Stored embeddings are reused, and the old collection is deleted
+        once its documents have been copied.
+    
+        Returns:
+            True if any documents were migrated
+        """
+        try:
+            legacy = self.client.get_collection(LEGACY_COLLECTION)
+        except Exception:
+            return False
+    
+        records = legacy.get(include=["documents", "metadatas", "embeddings"])
+        documents = [
+            ({"content": doc, "metadata": meta}, doc_id)
+            for doc, meta, doc_id in zip(records["documents"], records["metadatas"], records["ids"])
+        ]
+        if documents:
+            print(f" Migrating {len(documents)} documents from '{LEGACY_COLLECTION}' into shards...")
+            self.add_documents(documents, embeddings=list(records["embeddings"]))
+        self.client.delete_collection(LEGACY_COLLECTION)
+        return bool(documents)
+    
+    def add_documents(self, documents: List[Tuple[Dict, str]], embeddings: Optional[List] = None):
+        """Route (document, id) pairs, and optional embeddings, into the shard matching their type"""
+        shards: Dict[str, Dict[str, list]] = {}
+        for index, (doc, doc_id) in enumerate(documents):
+            shard = doc["metadata"].get("type", DEFAULT_SHARD)
+            if shard not in self.collections:
+                shard = DEFAULT_SHARD
+            batch = shards.setdefault(shard, {"documents": [], "metadatas": [], "ids": []})
+            batch["documents"].append(doc["content"])
+            batch["metadatas"].append(doc["metadata"])
+            batch["ids"].append(doc_id)
+            if embeddings is not None:
+                batch.setdefault("embeddings", []).append(embeddings[index])
+    
+        # Load into vector DB
+        for shard, batch in shards.items():
+            self.collections[shard].add(**batch)
+            print(f"Loaded {len(batch['documents'])} documents into '{shard}' shard")
+    
+    def select_shards(self, query: str) -> List[Tuple[str, int]]:
+        """Pick the non-empty shards relevant to the query, with their document counts"""
+        query_lower = query.lower()
+        selected = []
+        for shard in SHARD_CONFIG:
+            pattern = SHARD_PATTERNS.get(shard)
+            if pattern and not pattern.search(query_lower):
+                continue
+            count = self.collections[shard].count()
+            if count == 0:
+                continue
+            selected.append((shard, count))
+        return selected
+    
+    def query_shard(self, shard: str, query_embedding: List[float], n_results: int, count: int) -> List[Dict]:
+        results = self.collections[shard].query(
+            query_embeddings=[query_embedding],
+            n_results=min(n_results, count)
+        )
+        return [
+            {
+                "content": doc,
+                "metadata": meta,
+                "distance": distance
+            }
+            for doc, meta, distance in zip(
+                results['documents'][0], results['metadatas'][0], results['distances'][0]
+            )
+        ]
+    
+    def run_shard_query(self, shard: str, started: Dict, *args) -> List[Dict]:
+        """Worker wrapper that records the start time and frees the shard slot"""
+        try:
+            started["at"] = time.monotonic()
+            started["event"].set()
+            return self.query_shard(shard, *args)
+        finally:
+            self.shard_slots[shard].release()
     
     def retrieve_relevant_content(self, query: str, n_results: int = 3) -> List[Dict]:
         """
         Retrieve relevant mental health content from the vector database
-        
+    
+        The query is embedded once and sent to every relevant shard in
+        parallel. Shards that are busy, fail, or exceed their timeout are
+        skipped, and the remaining hits are merged by similarity. Each
+        shard's timeout counts from when its query starts, and time spent
+        waiting for a worker is bounded by the same timeout.
+    
         Args:
             query: User's input message
             n_results: Number of relevant documents to retrieve (default: 3)
-            
+    
         Returns:
             List of dictionaries containing content and metadata
         """
         try:
+            shards = self.select_shards(query)
             # Check if database has any documents
-            if self.collection.count() == 0:
+            if not shards:
                 print(" Vector DB is empty. LLM will respond without RAG context.")
                 return []
-            
-            results = self.collection.query(
-                query_texts=[query],
-                n_results=n_results
-            )
-            
+    
+            query_embedding = self.embedding_function([query])[0]
+    
+            jobs = {}
+            for shard, count in shards:
+                if not self.shard_slots[shard].acquire(blocking=False):
+                    print(f" Shard '{shard}' is busy - skipping")
+                    continue
+                started = {"event": threading.Event(), "at": None}
+                future = self.executors[shard].submit(
+                    self.run_shard_query, shard, started, query_embedding, n_results, count
+                )
+                jobs[shard] = (future, started)
+    
+            hits = []
+            for shard, (future, started) in jobs.items():
+                timeout = SHARD_CONFIG[shard]["timeout"]
+                try:
+                    if not started["event"].wait(timeout):
+                        if future.cancel():
+                            # Never reached a worker, so its slot is ours to free
+                            self.shard_slots[shard].release()
+                            print(f" Shard '{shard}' is busy - skipping")
+                            continue
+                        # Picked up just as we gave up waiting; about to start
+                        started["event"].wait()
+                    remaining = timeout - (time.monotonic() - started["at"])
+                    hits.extend(future.result(timeout=max(remaining, 0)))
+                except FutureTimeoutError:
+                    print(f" Shard '{shard}' timed out - skipping")
+                except Exception as e:
+                    print(f" Shard '{shard}' failed: {e} - skipping")
+    
             # Check if any results were returned
-            if not results['documents'][0]:
+            if not hits:
                 print(" No matching documents found in Vector DB. LLM will respond without RAG context.")
                 return []
-            
+    
+            hits.sort(key=lambda hit: hit["distance"])
             return [
                 {
-                    "content": doc,
-                    "metadata": meta
+                    "content": hit["content"],
+                    "metadata": hit["metadata"]
                 }
-                for doc, meta in zip(results['documents'][0], results['metadatas'][0])
+                for hit in hits[:n_results]
             ]
         except Exception as e:
             print(f" Error retrieving from Vector DB: {e}. LLM will respond without RAG context.")